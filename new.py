@@ -1,19 +1,33 @@
-import random
+import numpy as np
 from OpenGL.GL import *
 from OpenGL.GLU import *
 from OpenGL.GLUT import *
 from math import cos, sin
 
-# Ripple properties: [x, y, radius, opacity]
-ripples = []
+# Ripple properties, one array per field (structure of arrays)
+ripple_x = np.array([], dtype=np.float32)
+ripple_y = np.array([], dtype=np.float32)
+ripple_r = np.array([], dtype=np.float32)  # Radius
+ripple_a = np.array([], dtype=np.float32)  # Opacity
 base_radius = 5
 expansion_speed = 0.8  # Speed of ripple expansion
 fade_speed = 0.02  # Speed of opacity reduction
 paused = False
 wind_direction = 0  # Wind direction: negative for left, positive for right
 
-# Raindrops properties: [x, y, speed, dx, size]
-raindrops = []
+# Raindrop properties, one array per field (structure of arrays)
+drop_x = np.array([], dtype=np.float32)
+drop_y = np.array([], dtype=np.float32)
+drop_speed = np.array([], dtype=np.float32)  # Falling speed
+drop_dx = np.array([], dtype=np.float32)  # Horizontal motion variation
+drop_size = np.array([], dtype=np.float32)
+
+rng = np.random.default_rng()  # Random source for raindrop spawning
+
+# Unit circle points for drawing ripples, every 5 degrees
+circle_angles = np.deg2rad(np.arange(0, 361, 5, dtype=np.float32))
+circle_cos = np.cos(circle_angles)
+circle_sin = np.sin(circle_angles)
 
 # Cloud properties
 cloud_x = 400
@@ -42,49 +56,59 @@ def drawOceanSurface():
     glEnd()
 
 
+def addRipples(xs, ys, radii):
+    global ripple_x, ripple_y, ripple_r, ripple_a
+    ripple_x = np.concatenate((ripple_x, np.asarray(xs, dtype=np.float32)))
+    ripple_y = np.concatenate((ripple_y, np.asarray(ys, dtype=np.float32)))
+    ripple_r = np.concatenate((ripple_r, np.asarray(radii, dtype=np.float32)))
+    ripple_a = np.concatenate((ripple_a, np.ones(len(radii), dtype=np.float32)))  # Fully opaque
+
+
 def updateRainAndRipples(value):
-    global ripples, raindrops, expansion_speed, fade_speed, paused, wind_direction
+    global ripple_x, ripple_y, ripple_r, ripple_a
+    global drop_x, drop_y, drop_speed, drop_dx, drop_size
 
     if not paused:
         # Update ripples
-        updated_ripples = []
-        for ripple in ripples:
-            ripple[2] += expansion_speed  # Expand ripple
-            ripple[3] -= fade_speed  # Fade ripple
-            if ripple[3] > 0:  # Keep visible ripples
-                updated_ripples.append(ripple)
-        ripples = updated_ripples
+        ripple_r += expansion_speed  # Expand ripples
+        ripple_a -= fade_speed  # Fade ripples
+        visible = ripple_a > 0  # Keep visible ripples
+        if not visible.all():  # Only compact when a ripple has faded out
+            ripple_x = ripple_x[visible]
+            ripple_y = ripple_y[visible]
+            ripple_r = ripple_r[visible]
+            ripple_a = ripple_a[visible]
 
         # Update raindrops
-        updated_raindrops = []
-        for drop in raindrops:
-            drop[0] += drop[3] + wind_direction  # Apply horizontal motion
-            drop[1] -= drop[2]  # Apply vertical motion
-
-            if drop[1] <= 0:  # If raindrop hits the water
-                ripples.append([drop[0], 0, base_radius + drop[4], 1.0])  # Generate larger ripple
-            else:
-                updated_raindrops.append(drop)
-        raindrops = updated_raindrops
-
-        # Generate new raindrops
-        for _ in range(random.randint(3, 5)):  # Increase raindrop count
-            size = random.uniform(8.0, 20.0)  # Larger drop size
-            raindrops.append([
-                random.randint(cloud_x - cloud_width // 2, cloud_x + cloud_width // 2),
-                cloud_y - cloud_height // 2,
-                random.uniform(2.0, 5.0),  # Falling speed
-                random.uniform(-1.0, 1.0),  # Horizontal motion variation
-                size  # Raindrop size
-            ])
+        drop_x += drop_dx + wind_direction  # Apply horizontal motion
+        drop_y -= drop_speed  # Apply vertical motion
+
+        landed = drop_y <= 0  # Raindrops that hit the water
+        if landed.any():
+            addRipples(drop_x[landed], np.zeros(np.count_nonzero(landed)),
+                       base_radius + drop_size[landed])  # Generate larger ripples
+            falling = ~landed
+            drop_x = drop_x[falling]
+            drop_y = drop_y[falling]
+            drop_speed = drop_speed[falling]
+            drop_dx = drop_dx[falling]
+            drop_size = drop_size[falling]
+
+        # Generate new raindrops, all in one batch
+        count = rng.integers(3, 6)  # Increase raindrop count
+        left = cloud_x - cloud_width // 2
+        right = cloud_x + cloud_width // 2
+        drop_x = np.concatenate((drop_x, rng.integers(left, right + 1, count).astype(np.float32)))
+        drop_y = np.concatenate((drop_y, np.full(count, cloud_y - cloud_height // 2, dtype=np.float32)))
+        drop_speed = np.concatenate((drop_speed, rng.uniform(2.0, 5.0, count).astype(np.float32)))
+        drop_dx = np.concatenate((drop_dx, rng.uniform(-1.0, 1.0, count).astype(np.float32)))
+        drop_size = np.concatenate((drop_size, rng.uniform(8.0, 20.0, count).astype(np.float32)))  # Larger drop size
 
     glutPostRedisplay()
     glutTimerFunc(16, updateRainAndRipples, 0)  # Approx. 60 FPS
 
 
 def display():
-    global ripples, raindrops
-
     glClear(GL_COLOR_BUFFER_BIT)
     glEnable(GL_BLEND)
     glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA)
@@ -97,31 +121,50 @@ def display():
 
     # Draw raindrops (larger)
     glColor3f(0.5, 0.5, 1.0)
-    glBegin(GL_LINES)
-    for drop in raindrops:
-        # Draw raindrops as circles
-        glVertex2f(drop[0], drop[1])
-        glVertex2f(drop[0], drop[1] - drop[4])  # Make drop larger
-
-    glEnd()
-
-    # Draw ripples
-    for ripple in ripples:
-        glColor4f(0.5, 0.8, 1.0, ripple[3])  # Ripple color with opacity
-        glBegin(GL_LINE_LOOP)
-        for angle in range(0, 361, 5):
-            x = ripple[0] + ripple[2] * cos(angle * 3.14159 / 180)
-            y = ripple[1] + ripple[2] * sin(angle * 3.14159 / 180)
-            glVertex2f(x, y)
-        glEnd()
+    count = len(drop_x)
+    if count:
+        # One line per raindrop, from its tip up to its tail
+        vertices = np.empty((2 * count, 2), dtype=np.float32)
+        vertices[0::2, 0] = drop_x
+        vertices[0::2, 1] = drop_y
+        vertices[1::2, 0] = drop_x
+        vertices[1::2, 1] = drop_y - drop_size  # Make drop larger
+
+        glBindBuffer(GL_ARRAY_BUFFER, raindrop_vbo)
+        glBufferData(GL_ARRAY_BUFFER, vertices.nbytes, vertices, GL_STREAM_DRAW)
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glVertexPointer(2, GL_FLOAT, 0, None)
+        glDrawArrays(GL_LINES, 0, 2 * count)
+        glDisableClientState(GL_VERTEX_ARRAY)
+        glBindBuffer(GL_ARRAY_BUFFER, 0)  # Ripples below use client-side arrays
+
+    # Draw ripples, all outlines in a single call
+    count = len(ripple_x)
+    if count:
+        points = len(circle_angles)
+        vertices = np.empty((count, points, 2), dtype=np.float32)
+        vertices[:, :, 0] = ripple_x[:, None] + ripple_r[:, None] * circle_cos
+        vertices[:, :, 1] = ripple_y[:, None] + ripple_r[:, None] * circle_sin
+        colors = np.empty((count, points, 4), dtype=np.float32)
+        colors[:, :, :3] = (0.5, 0.8, 1.0)  # Ripple color
+        colors[:, :, 3] = ripple_a[:, None]  # With opacity
+        firsts = np.arange(0, count * points, points, dtype=np.int32)
+        counts = np.full(count, points, dtype=np.int32)
+
+        glEnableClientState(GL_VERTEX_ARRAY)
+        glEnableClientState(GL_COLOR_ARRAY)
+        glVertexPointer(2, GL_FLOAT, 0, vertices)
+        glColorPointer(4, GL_FLOAT, 0, colors)
+        glMultiDrawArrays(GL_LINE_LOOP, firsts, counts, count)
+        glDisableClientState(GL_COLOR_ARRAY)
+        glDisableClientState(GL_VERTEX_ARRAY)
 
     glutSwapBuffers()
 
 
 def mouseClick(button, state, x, y):
-    global ripples, base_radius
     if button == GLUT_LEFT_BUTTON and state == GLUT_DOWN:
-        ripples.append([x, 600 - y, base_radius, 1.0])  # Add new ripple
+        addRipples([x], [600 - y], [base_radius])  # Add new ripple
         glutPostRedisplay()
 
 
@@ -154,6 +197,8 @@ glutCreateWindow(b"Interactive Rain, Wind, and Ripples Simulation")
 glClearColor(0.0, 0.0, 0.0, 0.0)
 gluOrtho2D(0, 800, 0, 600)
 
+raindrop_vbo = glGenBuffers(1)  # Refilled with the raindrop lines every frame
+
 glutDisplayFunc(display)
 glutMouseFunc(mouseClick)
 glutKeyboardFunc(keyboardListener)